@@ -51,63 +51,581 @@ Using the above example again, the three entries that sum to 2020 are
 In your expense report, what is the product of the three entries that
 sum to 2020?
 """
-from typing import List, Optional
+import multiprocessing
+import os
+import pickle
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations, combinations_with_replacement, repeat
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.synchronize import Event
+from operator import sub
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
+PairIndex = Dict[int, List[Tuple[int, int]]]
 
-def exists_binary_search(
-        array: List[int],
-        value: int,
-        start: Optional[int] = None,
-        end: Optional[int] = None,
+
+def read_expenses(filename: str = 'input.txt') -> List[int]:
+    """Reads all the expense entries from a report"""
+    with open(filename) as infile:
+        return list(map(int, infile.read().split()))
+
+
+def _two_sum(
+        nums: List[int],
+        target: int,
+        find_all: bool,
+) -> List[Tuple[int, ...]]:
+    """Finds pairs summing to target in O(n) using a hash index"""
+    seen = set()
+    solutions: List[Tuple[int, ...]] = []
+    found = set()
+    for num in nums:
+        complement = target - num
+        if complement in seen:
+            solution = (min(num, complement), max(num, complement))
+            if solution not in found:
+                if not find_all:
+                    return [solution]
+
+                found.add(solution)
+                solutions.append(solution)
+
+        seen.add(num)
+
+    return solutions
+
+
+def _sorted_k_sum(
+        nums: List[int],
+        k: int,
+        target: int,
+        start: int,
+        prefix: Tuple[int, ...],
+        find_all: bool,
+        solutions: List[Tuple[int, ...]],
 ) -> bool:
-    """Returns if given number exists in an array"""
-    if start is None or end is None:
-        start, end = 0, len(array)-1
+    """
+    Finds k entries in nums[start:] that sum to target, where nums is
+    sorted. Uses two pointers at the innermost level, so no sublists are
+    created. Returns True once a solution is found and find_all is off.
+    """
+    end = len(nums) - 1
+
+    if k == 2:
+        left, right = start, end
+        while left < right:
+            total = nums[left] + nums[right]
+            if total < target:
+                left += 1
+            elif total > target:
+                right -= 1
+            else:
+                solutions.append(prefix + (nums[left], nums[right]))
+                if not find_all:
+                    return True
+
+                left += 1
+                while left < right and nums[left] == nums[left-1]:
+                    left += 1
+                right -= 1
 
-    if start > end:
         return False
 
-    mid = (start + end) // 2
+    for i in range(start, end - k + 2):
+        if i > start and nums[i] == nums[i-1]:
+            continue
+
+        found = _sorted_k_sum(
+            nums, k-1, target - nums[i], i+1,
+            prefix + (nums[i],), find_all, solutions,
+        )
+        if found:
+            return True
+
+    return False
+
 
-    if array[mid] == value:
+def _fits(values: Tuple[int, ...], counts: Dict[int, int]) -> bool:
+    """Checks that no value is used more often than it appears"""
+    if len(set(values)) == len(values):
         return True
 
-    if array[mid] < value:
-        return exists_binary_search(array, value, mid+1, end)
+    value_counts = Counter(values)
+    return all(counts[value] >= count for value, count in value_counts.items())
 
-    return exists_binary_search(array, value, start, mid-1)
 
+def _meet_in_the_middle(
+        nums: List[int],
+        k: int,
+        target: int,
+        find_all: bool,
+) -> List[Tuple[int, ...]]:
+    """
+    Finds k entries summing to target by splitting every sorted solution
+    into its k//2 smallest values and the rest. Both halves are built
+    from the distinct values, so repeated entries do not multiply the
+    work, and the value counts make sure no entry is used twice.
 
-def part1() -> None:
-    """Solution for part 1"""
-    with open('input.txt') as infile:
-        nums = [int(line) for line in infile.readlines()]
+    The distinct values are walked in order as pivots. The table only
+    holds left halves ending at or below the pivot, and the right halves
+    start at the pivot, so every solution is found exactly once. For
+    k=4 this takes O(d^2) hash lookups for d distinct values.
+    """
+    counts = Counter(nums)
+    values = sorted(counts)
+    left_size = k // 2
+    right_size = k - left_size
 
-    nums.sort()
+    half_sums: Dict[int, List[Tuple[int, ...]]] = {}
+    solutions: List[Tuple[int, ...]] = []
+    for pivot, pivot_value in enumerate(values):
+        for rest in combinations_with_replacement(
+                values[:pivot+1], left_size-1):
+            left = rest + (pivot_value,)
+            if _fits(left, counts):
+                half_sums.setdefault(sum(left), []).append(left)
 
-    for num in nums:
-        complement = 2020-num
-        exists = exists_binary_search(nums, complement)
-        if exists:
-            print(num * complement)
-            return
+        for rest in combinations_with_replacement(
+                values[pivot:], right_size-1):
+            right = (pivot_value,) + rest
+            if not _fits(right, counts):
+                continue
 
+            for left in half_sums.get(target - sum(right), ()):
+                solution = left + right
+                # The halves can only share the pivot value
+                if left[-1] == pivot_value and not _fits(solution, counts):
+                    continue
 
-def part2() -> None:
-    """Solution for part 2"""
-    with open('input.txt') as infile:
-        nums = [int(line) for line in infile.readlines()]
+                solutions.append(solution)
+                if not find_all:
+                    return solutions
+
+    return solutions
+
+
+def _bulk_k_sum(
+        nums: List[int],
+        k: int,
+        target: int,
+        find_all: bool,
+) -> List[Tuple[int, ...]]:
+    """
+    Finds k entries summing to target by fixing the k-2 smallest values,
+    and resolving the complements of all remaining values at once with a
+    single set intersection, instead of probing them one at a time.
+    """
+    counts = Counter(nums)
+    values = sorted(counts)
+
+    solutions: List[Tuple[int, ...]] = []
+    for prefix in combinations_with_replacement(values, k-2):
+        remaining = target - sum(prefix)
+        lowest = prefix[-1] if prefix else values[0]
+        candidates = values[bisect_left(values, lowest):]
+
+        matches = counts.keys() & set(map(sub, repeat(remaining), candidates))
+        for largest in sorted(matches):
+            second_largest = remaining - largest
+            if not lowest <= second_largest <= largest:
+                continue
+
+            solution = prefix + (second_largest, largest)
+            solution_counts = Counter(solution)
+            if all(counts[value] >= solution_counts[value]
+                   for value in solution_counts):
+                solutions.append(solution)
+                if not find_all:
+                    return solutions
+
+    return solutions
+
+
+def find_k_sum(
+        nums: List[int],
+        k: int,
+        target: int,
+        find_all: bool = False,
+        backend: str = 'scan',
+) -> List[Tuple[int, ...]]:
+    """
+    Finds k distinct entries in nums that sum up to target.
+
+    Every solution is a sorted tuple of values. If find_all is False,
+    at most one solution is returned, otherwise all of the distinct
+    solutions are returned.
+
+    The 'scan' backend walks the entries one at a time, switching to a
+    meet-in-the-middle search for k >= 4, while the 'bulk' backend
+    resolves all complements with set operations.
+    """
+    if k < 2:
+        raise ValueError(f'k must be at least 2, got {k}')
+
+    if backend == 'bulk':
+        return _bulk_k_sum(nums, k, target, find_all) if nums else []
+
+    if backend != 'scan':
+        raise ValueError(f'Unknown backend: {backend}')
+
+    if k == 2:
+        return _two_sum(nums, target, find_all)
+
+    if k >= 4:
+        return _meet_in_the_middle(nums, k, target, find_all)
+
+    solutions: List[Tuple[int, ...]] = []
+    _sorted_k_sum(sorted(nums), k, target, 0, (), find_all, solutions)
+    return solutions
+
+
+def stream_expenses(
+        filename: str = 'input.txt',
+        chunk_size: int = 1 << 16,
+) -> Iterator[int]:
+    """Yields the entries of a report, reading it in fixed size chunks"""
+    with open(filename, 'rb') as infile:
+        leftover = b''
+        while True:
+            chunk = infile.read(chunk_size)
+            if not chunk:
+                break
+
+            tokens = (leftover + chunk).split()
+            # The last number may continue into the next chunk
+            if tokens and not chunk[-1:].isspace():
+                leftover = tokens.pop()
+            else:
+                leftover = b''
+
+            yield from map(int, tokens)
+
+        if leftover:
+            yield int(leftover)
+
+
+def stream_two_sum(
+        filename: str = 'input.txt',
+        target: int = 2020,
+        chunk_size: int = 1 << 16,
+) -> Optional[Tuple[int, int]]:
+    """
+    Finds the first pair of entries that sum to target while streaming
+    the report, remembering seen values in a bitset. Memory use only
+    depends on target, not on the size of the report.
+
+    The bitset covers the values 0 to target, so target must not be
+    negative, and entries outside of that range are skipped: they can
+    only be part of a matching pair together with a negative entry.
+    """
+    if target < 0:
+        raise ValueError(f'target must not be negative, got {target}')
+
+    seen = bytearray(target // 8 + 1)
+    for num in stream_expenses(filename, chunk_size):
+        if not 0 <= num <= target:
+            continue
+
+        complement = target - num
+        if seen[complement >> 3] & (1 << (complement & 7)):
+            return min(num, complement), max(num, complement)
+
+        seen[num >> 3] |= 1 << (num & 7)
+
+    return None
+
+
+# Per-process state of the parallel 3-sum workers
+_worker_memory: Optional[SharedMemory] = None
+_worker_nums: Optional[memoryview] = None
+_worker_stop: Optional[Event] = None
+
+
+def _init_three_sum_worker(
+        memory_name: str,
+        length: int,
+        stop_event: Event,
+) -> None:
+    """Attaches a worker process to the shared sorted report"""
+    global _worker_memory, _worker_nums, _worker_stop
+    _worker_memory = SharedMemory(name=memory_name)
+    _worker_nums = _worker_memory.buf[:length * 8].cast('q')
+    _worker_stop = stop_event
+
+
+def _three_sum_shard(
+        target: int,
+        shard: int,
+        shard_count: int,
+) -> Optional[Tuple[int, ...]]:
+    """
+    Runs the two-pointer 3-sum for every outer index in this shard,
+    giving up as soon as any other shard has found a solution.
+    """
+    assert _worker_nums is not None and _worker_stop is not None
+    nums = _worker_nums
+    end = len(nums) - 1
 
-    nums.sort()
+    for i in range(shard, end - 1, shard_count):
+        if _worker_stop.is_set():
+            return None
 
+        left, right = i+1, end
+        remaining = target - nums[i]
+        while left < right:
+            total = nums[left] + nums[right]
+            if total < remaining:
+                left += 1
+            elif total > remaining:
+                right -= 1
+            else:
+                _worker_stop.set()
+                return nums[i], nums[left], nums[right]
+
+    return None
+
+
+def find_three_sum_parallel(
+        nums: List[int],
+        target: int,
+        workers: Optional[int] = None,
+) -> List[Tuple[int, ...]]:
+    """
+    Finds three entries summing to target, with the outer loop sharded
+    across a process pool. The sorted report is placed in shared memory
+    once, and the remaining shards are cancelled after the first match.
+    Returns at most one solution, like find_k_sum.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Shards are interleaved, so that each one gets a similar amount of
+    # work even though the inner loop shrinks as the outer index grows
+    shard_count = workers * 4
+
+    sorted_nums = array('q', sorted(nums))
+    memory = SharedMemory(create=True, size=max(len(sorted_nums) * 8, 1))
+    try:
+        memory.buf[:len(sorted_nums) * 8] = sorted_nums.tobytes()
+        stop_event = multiprocessing.Event()
+
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_three_sum_worker,
+                initargs=(memory.name, len(sorted_nums), stop_event),
+        ) as executor:
+            futures = [
+                executor.submit(_three_sum_shard, target, shard, shard_count)
+                for shard in range(shard_count)
+            ]
+
+            for future in as_completed(futures):
+                solution = future.result()
+                if solution is not None:
+                    stop_event.set()
+                    for pending in futures:
+                        pending.cancel()
+                    return [solution]
+
+        return []
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def product(values: Tuple[int, ...]) -> int:
+    """Multiplies all the values together"""
+    result = 1
+    for value in values:
+        result *= value
+
+    return result
+
+
+class PairSumHistogram:
+    """
+    Number of pairs of distinct entries for every possible pair sum.
+
+    The value counts are convolved with themselves in a single pass by
+    packing them into one big integer and squaring it (Kronecker
+    substitution), which CPython multiplies in sub-quadratic time. The
+    cost depends on the value domain, not on the number of targets.
+
+    Counts are list lookups. A witness pair is found on first request by
+    one scan over the distinct values, and cached per target.
+    """
+    def __init__(self, nums: List[int]) -> None:
+        self.offset = min(nums, default=0)
+        domain = max(nums, default=0) - self.offset + 1
+
+        value_counts = [0] * domain
+        for num in nums:
+            value_counts[num - self.offset] += 1
+
+        self.value_counts = value_counts
+        self.values = sorted(set(nums))
+        self.witnesses: Dict[int, Optional[Tuple[int, int]]] = {}
+
+        # Every slot must hold up to n^2 ordered pairs without overflow
+        width = ((len(nums) ** 2).bit_length() + 8) // 8
+        packed = bytearray(domain * width)
+        for index, count in enumerate(value_counts):
+            if count:
+                packed[index * width:(index+1) * width] = (
+                    count.to_bytes(width, 'little')
+                )
+
+        polynomial = int.from_bytes(packed, 'little')
+        squared = (polynomial * polynomial).to_bytes(
+            (2*domain - 1) * width, 'little')
+
+        self.counts: List[int] = []
+        for index in range(2*domain - 1):
+            ordered_pairs = int.from_bytes(
+                squared[index * width:(index+1) * width], 'little')
+
+            # Drop the pairs of an entry with itself, and count every
+            # unordered pair once
+            if index % 2 == 0:
+                ordered_pairs -= value_counts[index // 2]
+            self.counts.append(ordered_pairs // 2)
+
+    def count(self, target: int) -> int:
+        """Number of pairs of distinct entries that sum to target"""
+        index = target - 2*self.offset
+        if not 0 <= index < len(self.counts):
+            return 0
+
+        return self.counts[index]
+
+    def witness(self, target: int) -> Optional[Tuple[int, int]]:
+        """
+        Returns one pair of entries that sums to target, if any. The pair
+        is found by scanning the distinct values once, and remembered for
+        later calls with the same target.
+        """
+        if target in self.witnesses:
+            return self.witnesses[target]
+
+        pair = None
+        if self.count(target) > 0:
+            for value in self.values:
+                complement = target - value
+                if complement < value:
+                    break
+
+                index = complement - self.offset
+                if index >= len(self.value_counts):
+                    continue
+
+                needed = 2 if complement == value else 1
+                if self.value_counts[index] >= needed:
+                    pair = (value, complement)
+                    break
+
+        self.witnesses[target] = pair
+        return pair
+
+
+def build_pair_index(nums: List[int]) -> PairIndex:
+    """Maps every pairwise sum to the index pairs that produce it"""
+    index: PairIndex = {}
     for i, num1 in enumerate(nums):
-        for num2 in nums[i+1:]:
-            complement = 2020 - (num1+num2)
+        for j in range(i+1, len(nums)):
+            index.setdefault(num1 + nums[j], []).append((i, j))
+
+    return index
+
+
+def load_pair_index(
+        filename: str = 'input.txt',
+) -> Tuple[List[int], PairIndex]:
+    """
+    Returns the report and its pair index. The index is cached on disk
+    next to the report, and rebuilt only when the report changes.
+    """
+    index_filename = filename + '.pairs.pickle'
+    stat = os.stat(filename)
+    signature = (stat.st_size, stat.st_mtime_ns)
+
+    if os.path.exists(index_filename):
+        try:
+            with open(index_filename, 'rb') as index_file:
+                cached_signature, nums, index = pickle.load(index_file)
+        except (EOFError, pickle.UnpicklingError):
+            # A damaged cache is rebuilt like a stale one
+            cached_signature = None
+
+        if cached_signature == signature:
+            return nums, index
+
+    nums = read_expenses(filename)
+    index = build_pair_index(nums)
+
+    # Replacing the cache in one step means an interrupted write can
+    # never leave a truncated cache behind
+    temp_filename = index_filename + '.tmp'
+    with open(temp_filename, 'wb') as index_file:
+        pickle.dump((signature, nums, index), index_file)
+    os.replace(temp_filename, index_filename)
+
+    return nums, index
+
+
+def batch_query(
+        nums: List[int],
+        index: PairIndex,
+        targets: Sequence[int],
+        k: int,
+) -> Dict[int, Optional[Tuple[int, ...]]]:
+    """
+    Answers 2-sum or 3-sum queries for all the targets using a pair
+    index, returning one sorted solution (or None) per target.
+    """
+    if k not in (2, 3):
+        raise ValueError(f'k must be 2 or 3, got {k}')
+
+    results: Dict[int, Optional[Tuple[int, ...]]] = {}
+    for target in targets:
+        results[target] = None
+
+        if k == 2:
+            pairs = index.get(target)
+            if pairs:
+                i, j = pairs[0]
+                results[target] = tuple(sorted((nums[i], nums[j])))
+            continue
+
+        for i, num in enumerate(nums):
+            for j, l in index.get(target - num, ()):
+                if i not in (j, l):
+                    results[target] = tuple(sorted((num, nums[j], nums[l])))
+                    break
+
+            if results[target] is not None:
+                break
+
+    return results
+
+
+def part1() -> None:
+    """Solution for part 1"""
+    nums = read_expenses()
+
+    solutions = find_k_sum(nums, 2, 2020)
+    if solutions:
+        print(product(solutions[0]))
+
+
+def part2() -> None:
+    """Solution for part 2"""
+    nums = read_expenses()
 
-            exists = exists_binary_search(nums, complement)
-            if exists:
-                print(num1 * num2 * complement)
-                return
+    solutions = find_k_sum(nums, 3, 2020)
+    if solutions:
+        print(product(solutions[0]))
 
 
 if __name__ == "__main__":
@@ -58,52 +58,269 @@ Given the same example list from above:
 How many passwords are valid according to the new interpretation of the
 policies?
 """
+import json
+import mmap
+import os
 import re
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from operator import and_, eq, getitem, le, sub, xor
+from typing import Callable, List, Optional, Sequence, Tuple
 
+PASSWORD_PATTERN = re.compile(r'^(\d+)-(\d+) ([a-z]): ([a-z]+)$', re.MULTILINE)
 
-def get_password_values(line: str) -> Tuple[int, int, str, str]:
-    """Return first two numbers, character and password from input"""
-    match = re.match(r'^(\d+)-(\d+) ([a-z]): ([a-z]+)$', line)
-    assert match is not None, 'Invalid input file'
+PasswordColumns = Tuple[List[int], List[int], List[str], List[str]]
+Policy = Callable[[int, int, str, str], bool]
 
-    num1str, num2str, char, password = match.groups()
-    num1, num2 = int(num1str), int(num2str)
 
-    return num1, num2, char, password
+def parse_passwords(data: str) -> PasswordColumns:
+    """
+    Parses a whole password database at once, returning the first
+    numbers, second numbers, characters and passwords as columns
+    """
+    records = PASSWORD_PATTERN.findall(data)
+    line_count = data.count('\n')
+    if data and not data.endswith('\n'):
+        line_count += 1
+    assert len(records) == line_count, 'Invalid input file'
 
+    if not records:
+        return [], [], [], []
 
-def part1() -> None:
-    """Solution to part 1"""
-    valid_count = 0
+    num1strs, num2strs, chars, passwords = zip(*records)
+    return (
+        list(map(int, num1strs)),
+        list(map(int, num2strs)),
+        list(chars),
+        list(passwords),
+    )
 
-    with open('input.txt') as infile:
-        for line in infile.readlines():
-            min_count, max_count, char, password = get_password_values(line)
 
-            char_count = password.count(char)
-            if min_count <= char_count <= max_count:
-                valid_count += 1
+def read_passwords(filename: str = 'input.txt') -> PasswordColumns:
+    """Reads and parses a password database file"""
+    with open(filename) as infile:
+        return parse_passwords(infile.read())
 
-    print(valid_count)
 
+def count_policy(
+        min_count: int,
+        max_count: int,
+        char: str,
+        password: str,
+) -> bool:
+    """Checks that char occurs between min_count and max_count times"""
+    return min_count <= password.count(char) <= max_count
 
-def part2() -> None:
-    """Solution to part 2"""
-    valid_count = 0
 
-    with open('input.txt') as infile:
-        for line in infile.readlines():
-            index1, index2, char, password = get_password_values(line)
+def position_policy(
+        index1: int,
+        index2: int,
+        char: str,
+        password: str,
+) -> bool:
+    """Checks that char is at exactly one of the two 1-based positions"""
+    return (password[index1-1] == char) != (password[index2-1] == char)
+
+
+DEFAULT_POLICIES: Tuple[Policy, ...] = (count_policy, position_policy)
+
+
+def evaluate_policies(
+        columns: PasswordColumns,
+        policies: Sequence[Policy] = DEFAULT_POLICIES,
+) -> List[int]:
+    """
+    Checks every record against all the policies in a single pass, and
+    returns the number of valid passwords for each policy
+    """
+    valid_counts = [0] * len(policies)
+    for record in zip(*columns):
+        for index, policy in enumerate(policies):
+            if policy(*record):
+                valid_counts[index] += 1
+
+    return valid_counts
+
+
+def evaluate_columnar(columns: PasswordColumns) -> Tuple[int, int]:
+    """
+    Evaluates the count and position policies a whole column at a time.
+    Every step is a map over builtin operators, so no Python level code
+    runs per record. Returns the valid counts for both policies.
+    """
+    nums1, nums2, chars, passwords = columns
+
+    char_counts = list(map(str.count, passwords, chars))
+    count_valid = sum(map(
+        and_,
+        map(le, nums1, char_counts),
+        map(le, char_counts, nums2),
+    ))
+
+    first_matches = map(
+        eq, map(getitem, passwords, map(sub, nums1, repeat(1))), chars)
+    second_matches = map(
+        eq, map(getitem, passwords, map(sub, nums2, repeat(1))), chars)
+    position_valid = sum(map(xor, first_matches, second_matches))
+
+    return count_valid, position_valid
+
+
+def validate_file(
+        filename: str = 'input.txt',
+        policies: Sequence[Policy] = DEFAULT_POLICIES,
+) -> List[int]:
+    """Reads a password database once and validates it with all policies"""
+    return evaluate_policies(read_passwords(filename), policies)
+
+
+def chunk_boundaries(filename: str, chunk_count: int) -> List[Tuple[int, int]]:
+    """Splits a file into byte ranges that each end on a line boundary"""
+    size = os.path.getsize(filename)
+    if size == 0:
+        return []
+
+    boundaries = []
+    with open(filename, 'rb') as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            for chunk in range(1, chunk_count + 1):
+                end = size * chunk // chunk_count
+                if end <= start:
+                    continue
+
+                newline = data.find(b'\n', end - 1)
+                end = size if newline == -1 else newline + 1
+                boundaries.append((start, end))
+                start = end
+
+                if start == size:
+                    break
+
+    return boundaries
 
-            if password[index1-1] == char and password[index2-1] != char:
-                valid_count += 1
-            elif password[index1-1] != char and password[index2-1] == char:
-                valid_count += 1
 
+def _validate_chunk(
+        filename: str,
+        start: int,
+        end: int,
+        policies: Sequence[Policy],
+) -> List[int]:
+    """Validates the passwords in one byte range of a database file"""
+    with open(filename, 'rb') as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunk = data[start:end].decode()
+
+    return evaluate_policies(parse_passwords(chunk), policies)
+
+
+def validate_file_parallel(
+        filename: str = 'input.txt',
+        policies: Sequence[Policy] = DEFAULT_POLICIES,
+        workers: Optional[int] = None,
+) -> List[int]:
+    """
+    Validates a password database across a process pool. Every worker
+    memory-maps the file and only reads its own range of lines, and the
+    per-range valid counts are summed. Policies must be picklable, which
+    means module level functions.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    valid_counts = [0] * len(policies)
+    boundaries = chunk_boundaries(filename, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_validate_chunk, filename, start, end, policies)
+            for start, end in boundaries
+        ]
+        for future in futures:
+            for index, count in enumerate(future.result()):
+                valid_counts[index] += count
+
+    return valid_counts
+
+
+def follow_file(
+        filename: str = 'input.txt',
+        policies: Sequence[Policy] = DEFAULT_POLICIES,
+) -> List[int]:
+    """
+    Validates an append-only password database incrementally. The byte
+    offset and the running valid counts are stored next to the database,
+    so every call only parses the complete lines appended since the last
+    one. The counts are rebuilt from scratch if the file was truncated or
+    the policies changed.
+
+    Policies are told apart by their qualified names, so they have to be
+    module level functions; lambdas and nested functions are rejected.
+    """
+    state_filename = filename + '.follow.json'
+    policy_names = []
+    for policy in policies:
+        if '<' in policy.__qualname__:
+            raise ValueError(
+                f'Policy {policy.__qualname__} has no stable name, '
+                'use a module level function'
+            )
+        policy_names.append(f'{policy.__module__}.{policy.__qualname__}')
+
+    offset = 0
+    valid_counts = [0] * len(policies)
+    if os.path.exists(state_filename):
+        with open(state_filename) as state_file:
+            state = json.load(state_file)
+
+        if (state['policies'] == policy_names
+                and state['offset'] <= os.path.getsize(filename)):
+            offset = state['offset']
+            valid_counts = state['valid_counts']
+
+    with open(filename, 'rb') as infile:
+        infile.seek(offset)
+        new_data = infile.read()
+
+    # A trailing line without a newline may still be getting written
+    complete_length = new_data.rfind(b'\n') + 1
+    new_counts = evaluate_policies(
+        parse_passwords(new_data[:complete_length].decode()),
+        policies,
+    )
+    for index, count in enumerate(new_counts):
+        valid_counts[index] += count
+    offset += complete_length
+
+    # Replacing the state file in one step means a crash while writing
+    # can never leave a truncated state behind
+    temp_filename = state_filename + '.tmp'
+    with open(temp_filename, 'w') as state_file:
+        json.dump(
+            {
+                'offset': offset,
+                'policies': policy_names,
+                'valid_counts': valid_counts,
+            },
+            state_file,
+        )
+    os.replace(temp_filename, state_filename)
+
+    return valid_counts
+
+
+def part1() -> None:
+    """Solution to part 1"""
+    valid_count, = validate_file(policies=[count_policy])
+    print(valid_count)
+
+
+def part2() -> None:
+    """Solution to part 2"""
+    valid_count, = validate_file(policies=[position_policy])
     print(valid_count)
 
 
 if __name__ == "__main__":
-    part1()
-    part2()
+    # Both parts share a single read and parse of the database
+    for valid_count in validate_file(policies=DEFAULT_POLICIES):
+        print(valid_count)
@@ -88,30 +88,216 @@ respectively; multiplied together, these produce the answer 336.
 What do you get if you multiply together the number of trees encountered
 on each of the listed slopes?
 """
+from __future__ import annotations
 
+import mmap
+import os
+import pickle
+from itertools import repeat
+from operator import and_, mod, mul, rshift
+from typing import Any, Dict, List, Sequence, Tuple
 
-def part1() -> None:
-    """Solution for part 1"""
-    with open('input.txt') as infile:
-        lines = infile.read().splitlines()
+Slope = Tuple[int, int]
+
+TREE_BITS = str.maketrans('#.', '10')
+
+
+def read_bitboard(filename: str = 'input.txt') -> Tuple[List[int], int]:
+    """
+    Reads the map of the trees as one integer bitmask per row, where bit
+    n is set if there is a tree in column n. Returns the rows and width.
+    """
+    rows = []
+    width = 0
+    with open(filename) as infile:
+        for line in infile:
+            line = line.rstrip('\n')
+            width = len(line)
+            rows.append(int(line.translate(TREE_BITS)[::-1], 2))
+
+    return rows, width
+
+
+def count_trees(
+        rows: List[int],
+        cols: int,
+        slopes: Sequence[Slope],
+) -> List[int]:
+    """
+    Counts the trees hit by each (right, down) slope, walking the
+    bitboard rows only once and advancing every slope that lands on a row
+    """
+    slopes_by_down: Dict[int, List[int]] = {}
+    for index, (_, down) in enumerate(slopes):
+        slopes_by_down.setdefault(down, []).append(index)
+
+    positions = [0] * len(slopes)
+    tree_counts = [0] * len(slopes)
+    for row, trees in enumerate(rows):
+        for down, indices in slopes_by_down.items():
+            if row % down:
+                continue
+
+            for index in indices:
+                if trees >> positions[index] & 1:
+                    tree_counts[index] += 1
+
+                positions[index] = (positions[index] + slopes[index][0]) % cols
+
+    return tree_counts
+
+
+def sweep_slopes(
+        rows: List[int],
+        cols: int,
+        slopes: Sequence[Slope],
+) -> List[int]:
+    """
+    Counts the trees hit by each slope for large slope sweeps. For every
+    slope, the visited columns and the tree bits are gathered with maps
+    over builtin operators, so no Python level code runs per step.
+
+    Slopes whose right steps are equal modulo the width visit the same
+    cells, so each distinct slope is only counted once.
+    """
+    visited_rows: Dict[int, List[int]] = {}
+    known_counts: Dict[Slope, int] = {}
+
+    tree_counts = []
+    for right, down in slopes:
+        slope = (right % cols, down)
+        if slope not in known_counts:
+            if down not in visited_rows:
+                visited_rows[down] = rows[::down]
+            visited = visited_rows[down]
+
+            positions = map(
+                mod, map(mul, range(len(visited)), repeat(slope[0])),
+                repeat(cols),
+            )
+            tree_bits = map(and_, map(rshift, visited, positions), repeat(1))
+            known_counts[slope] = sum(tree_bits)
+
+        tree_counts.append(known_counts[slope])
+
+    return tree_counts
+
+
+class MappedGrid:
+    """
+    Map of the trees that is read straight from a memory-mapped file.
+    Every row has the same length, so cells are found by offset and the
+    file is never loaded into memory as a whole.
+    """
+    def __init__(self, filename: str = 'input.txt') -> None:
+        with open(filename, 'rb') as infile:
+            self.data = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.stride = self.data.find(b'\n') + 1
+        if self.stride == 0:
+            self.stride = len(self.data) + 1
+
+        self.cols = self.stride - 1
+        if self.cols and self.data[self.cols - 1] == ord('\r'):
+            self.cols -= 1
+
+        self.rows = (len(self.data) + self.stride - 1) // self.stride
+
+    def is_tree(self, row: int, col: int) -> bool:
+        """Checks if there is a tree at the given cell"""
+        return self.data[row * self.stride + col] == ord('#')
+
+    def close(self) -> None:
+        """Unmaps the file"""
+        self.data.close()
+
+    def __enter__(self) -> MappedGrid:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
 
-    row_length = len(lines[0])
-    tree_count = 0
-    for row, line in enumerate(lines):
-        col = (row * 3) % row_length
-        if line[col] == '#':
-            tree_count += 1
 
+def count_trees_mapped(grid: MappedGrid, slopes: Sequence[Slope]) -> List[int]:
+    """Counts the trees hit by each slope on a memory-mapped map"""
+    tree_counts = []
+    for right, down in slopes:
+        tree_count = 0
+        col = 0
+        for row in range(0, grid.rows, down):
+            if grid.is_tree(row, col):
+                tree_count += 1
+
+            col = (col + right) % grid.cols
+
+        tree_counts.append(tree_count)
+
+    return tree_counts
+
+
+class TreeIndex:
+    """
+    Index of the trees on a map, holding the bitmask of every row, so
+    that slope queries can be answered without parsing the map again
+    """
+    def __init__(self, rows: List[int], cols: int) -> None:
+        self.rows = rows
+        self.cols = cols
+
+    def count_trees(self, right: int, down: int) -> int:
+        """Counts the trees hit by a slope, for any right and down >= 1"""
+        if down < 1:
+            raise ValueError(f'down must be at least 1, got {down}')
+
+        if self.cols == 0:
+            return 0
+
+        tree_count, = sweep_slopes(self.rows, self.cols, [(right, down)])
+        return tree_count
+
+
+def load_tree_index(filename: str = 'input.txt') -> TreeIndex:
+    """
+    Returns the tree index of a map. The row bitmasks are cached on disk
+    next to the map, and only parsed again when the map changes.
+    """
+    index_filename = filename + '.bitboard.pickle'
+    stat = os.stat(filename)
+    signature = (stat.st_size, stat.st_mtime_ns)
+
+    if os.path.exists(index_filename):
+        try:
+            with open(index_filename, 'rb') as index_file:
+                cached_signature, rows, cols = pickle.load(index_file)
+        except (EOFError, pickle.UnpicklingError):
+            # A damaged cache is rebuilt like a stale one
+            cached_signature = None
+
+        if cached_signature == signature:
+            return TreeIndex(rows, cols)
+
+    rows, cols = read_bitboard(filename)
+
+    # Replacing the cache in one step means an interrupted write can
+    # never leave a truncated cache behind
+    temp_filename = index_filename + '.tmp'
+    with open(temp_filename, 'wb') as index_file:
+        pickle.dump((signature, rows, cols), index_file)
+    os.replace(temp_filename, index_filename)
+
+    return TreeIndex(rows, cols)
+
+
+def part1() -> None:
+    """Solution for part 1"""
+    rows, cols = read_bitboard()
+    tree_count, = count_trees(rows, cols, [(3, 1)])
     print(tree_count)
 
 
 def part2() -> None:
     """Solution for part 2"""
-    with open('input.txt') as infile:
-        grid = infile.read().splitlines()
-
-    rows = len(grid)
-    cols = len(grid[0])
+    rows, cols = read_bitboard()
 
     increments = [
         (1, 1),
@@ -121,18 +307,7 @@ def part2() -> None:
         (1, 2),
     ]
     product = 1
-    for right, down in increments:
-        tree_count = 0
-        row = 0
-        col = 0
-        while row < rows:
-            if grid[row][col] == '#':
-                tree_count += 1
-
-            row += down
-            col += right
-            col %= cols
-
+    for tree_count in count_trees(rows, cols, increments):
         product *= tree_count
 
     print(product)
@@ -137,40 +137,52 @@ Count the number of valid passports - those that have all required
 fields and valid values. Continue to treat cid as optional. In your
 batch file, how many passports are valid?
 """
+import os
 import re
-from typing import Callable, Dict
+import timeit
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import (Callable, Counter as CounterType, Deque, Dict, Iterator,
+                    List, Optional, Pattern, TextIO, Tuple)
+
+REQUIRED_FIELDS = frozenset((
+    'byr',
+    'iyr',
+    'eyr',
+    'hgt',
+    'hcl',
+    'ecl',
+    'pid',
+))
+
+
+def read_passports(infile: TextIO) -> Iterator[Dict[str, str]]:
+    """
+    Yields the passports in a batch file one at a time as field dicts,
+    reading the file line by line. Passports are separated by blank lines.
+    """
+    passport: Dict[str, str] = {}
+    for line in infile:
+        fields = line.split()
+        if not fields:
+            if passport:
+                yield passport
+                passport = {}
+            continue
 
-
-def part1() -> None:
-    """Solution for part 1"""
-    with open('input.txt') as infile:
-        data = infile.read()
-
-    required_fields = {
-        'byr',
-        'iyr',
-        'eyr',
-        'hgt',
-        'hcl',
-        'ecl',
-        'pid',
-    }
-
-    passports = data.split('\n\n')
-
-    valid_passports = 0
-    for passport in passports:
-        fields = passport.split()
-
-        field_names = set()
         for field in fields:
-            field_name = field.partition(':')[0]
-            field_names.add(field_name)
+            field_name, _, field_value = field.partition(':')
+            passport[field_name] = field_value
 
-        if required_fields.issubset(field_names):
-            valid_passports += 1
+    if passport:
+        yield passport
 
-    print(valid_passports)
+
+def part1() -> None:
+    """Solution for part 1"""
+    complete_passports, _ = count_passports()
+    print(complete_passports)
 
 
 def height_validator(height_str: str) -> bool:
@@ -191,53 +203,282 @@ def height_validator(height_str: str) -> bool:
     return 59 <= height <= 76
 
 
-def part2() -> None:
-    """Solution for part 2"""
-    with open('input.txt') as infile:
-        data = infile.read()
-
-    required_fields = {
-        'byr',
-        'iyr',
-        'eyr',
-        'hgt',
-        'hcl',
-        'ecl',
-        'pid',
-    }
-    validators: Dict[str, Callable[[str], bool]] = {
-        'byr': lambda x: 1920 <= int(x) <= 2002,
-        'iyr': lambda x: 2010 <= int(x) <= 2020,
-        'eyr': lambda x: 2020 <= int(x) <= 2030,
-        'hgt': height_validator,
-        'hcl': lambda x: re.match(r'^#[0-9a-f]{6}$', x) is not None,
-        'ecl': lambda x: x in ('amb', 'blu', 'brn',
-                               'gry', 'grn', 'hzl', 'oth'),
-        'pid': lambda x: re.match(r'^\d{9}$', x) is not None,
-    }
-
-    passports = data.split('\n\n')
+VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    'byr': lambda x: 1920 <= int(x) <= 2002,
+    'iyr': lambda x: 2010 <= int(x) <= 2020,
+    'eyr': lambda x: 2020 <= int(x) <= 2030,
+    'hgt': height_validator,
+    'hcl': lambda x: re.match(r'^#[0-9a-f]{6}$', x) is not None,
+    'ecl': lambda x: x in ('amb', 'blu', 'brn',
+                           'gry', 'grn', 'hzl', 'oth'),
+    'pid': lambda x: re.match(r'^\d{9}$', x) is not None,
+}
+
+# The same rules as VALIDATORS, with the number ranges spelled out as
+# patterns, so that every field is checked by one compiled regex
+FIELD_PATTERNS: Dict[str, Pattern[str]] = {
+    'byr': re.compile(r'19[2-9][0-9]|200[0-2]'),
+    'iyr': re.compile(r'201[0-9]|2020'),
+    'eyr': re.compile(r'202[0-9]|2030'),
+    'hgt': re.compile(r'(?:1[5-8][0-9]|19[0-3])cm|(?:59|6[0-9]|7[0-6])in'),
+    'hcl': re.compile(r'#[0-9a-f]{6}'),
+    'ecl': re.compile(r'amb|blu|brn|gry|grn|hzl|oth'),
+    'pid': re.compile(r'[0-9]{9}'),
+}
+
+
+def is_valid_passport(passport: Dict[str, str]) -> bool:
+    """Checks that all the required fields are present and valid"""
+    for field_name, pattern in FIELD_PATTERNS.items():
+        field_value = passport.get(field_name)
+        if field_value is None or pattern.fullmatch(field_value) is None:
+            return False
+
+    return True
+
+
+def is_valid_passport_legacy(passport: Dict[str, str]) -> bool:
+    """Checks a passport with the per-field validator functions"""
+    field_names = set()
+    for field_name, field_value in passport.items():
+        if field_name not in VALIDATORS:
+            continue
+
+        if VALIDATORS[field_name](field_value):
+            field_names.add(field_name)
 
+    return field_names.issuperset(REQUIRED_FIELDS)
+
+
+def benchmark_validators(
+        filename: str = 'input.txt',
+        number: int = 100,
+) -> None:
+    """Compares the compiled patterns with the validator functions"""
+    with open(filename) as infile:
+        passports = list(read_passports(infile))
+
+    validators: List[Callable[[Dict[str, str]], bool]] = [
+        is_valid_passport_legacy,
+        is_valid_passport,
+    ]
+    for validator in validators:
+        duration = timeit.timeit(
+            lambda: [validator(passport) for passport in passports],
+            number=number,
+        )
+        print(f'{validator.__name__}: {duration / number * 1000:.3f}ms')
+
+
+def rejection_reasons(passport: Dict[str, str]) -> List[str]:
+    """Lists every reason for a passport being invalid"""
+    reasons = []
+    for field_name, pattern in FIELD_PATTERNS.items():
+        field_value = passport.get(field_name)
+        if field_value is None:
+            reasons.append(f'{field_name}: missing')
+        elif pattern.fullmatch(field_value) is None:
+            reasons.append(f'{field_name}: invalid')
+
+    return reasons
+
+
+def _validate_chunk(
+        passports: List[Dict[str, str]],
+) -> Tuple[int, CounterType[str]]:
+    """Counts the valid passports and the rejection reasons in a chunk"""
     valid_passports = 0
+    reason_counts: CounterType[str] = Counter()
     for passport in passports:
-        fields = passport.split()
+        reasons = rejection_reasons(passport)
+        if reasons:
+            reason_counts.update(reasons)
+        else:
+            valid_passports += 1
+
+    return valid_passports, reason_counts
 
-        field_names = set()
-        for field in fields:
-            field_name, _, field_value = field.partition(':')
 
-            if field_name not in validators:
+def validate_passports_parallel(
+        filename: str = 'input.txt',
+        workers: Optional[int] = None,
+        chunk_size: int = 10000,
+) -> Tuple[int, CounterType[str]]:
+    """
+    Validates a batch file across a process pool, in chunks of passports.
+    Returns the number of valid passports, along with how many times each
+    field was missing or invalid. Only a few chunks are in flight at any
+    time, so the file is never held in memory as a whole.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    valid_passports = 0
+    reason_counts: CounterType[str] = Counter()
+
+    def collect(future: Future[Tuple[int, CounterType[str]]]) -> None:
+        nonlocal valid_passports
+        chunk_valid, chunk_reasons = future.result()
+        valid_passports += chunk_valid
+        reason_counts.update(chunk_reasons)
+
+    with open(filename) as infile, ProcessPoolExecutor(workers) as executor:
+        passports = read_passports(infile)
+        pending: Deque[Future[Tuple[int, CounterType[str]]]] = deque()
+        while True:
+            chunk = list(islice(passports, chunk_size))
+            if not chunk:
+                break
+
+            pending.append(executor.submit(_validate_chunk, chunk))
+            if len(pending) > 2 * workers:
+                collect(pending.popleft())
+
+        while pending:
+            collect(pending.popleft())
+
+    return valid_passports, reason_counts
+
+
+EYE_COLORS = frozenset(('amb', 'blu', 'brn', 'gry', 'grn', 'hzl', 'oth'))
+
+# The same rules as FIELD_PATTERNS, using a plain set lookup where a
+# pattern is not needed
+FIELD_CHECKS: Dict[str, Callable[[str], object]] = {
+    **{
+        field_name: pattern.fullmatch
+        for field_name, pattern in FIELD_PATTERNS.items()
+    },
+    'ecl': EYE_COLORS.__contains__,
+}
+
+
+# Relative cost of each field check, measured once with timeit: the
+# set lookup is about three times as fast as a simple pattern, and the
+# height pattern takes about twice as long as the others
+CHECK_COSTS: Dict[str, float] = {
+    'byr': 3.0,
+    'iyr': 3.0,
+    'eyr': 3.0,
+    'hgt': 6.0,
+    'hcl': 3.0,
+    'ecl': 1.0,
+    'pid': 3.0,
+}
+
+
+class ValidationPlanner:
+    """
+    Validates passports one check at a time, stopping at the first check
+    that fails. Presence of all the required fields is checked first, as
+    it is the cheapest. The field checks are then run in order of their
+    rejection rate divided by their cost from CHECK_COSTS, so that cheap
+    checks that reject many passports run first.
+
+    When checks stop at the first failure, a check that runs late only
+    ever sees passports that passed the earlier ones, so its rejection
+    rate is biased and the first order tends to stick. To avoid that,
+    every `sample_interval`-th passport runs all of the field checks, and
+    only those samples are used for the statistics. The order is updated
+    after every `reorder_interval` samples.
+    """
+    def __init__(
+            self,
+            sample_interval: int = 16,
+            reorder_interval: int = 64,
+    ) -> None:
+        self.sample_interval = sample_interval
+        self.reorder_interval = reorder_interval
+        self.until_sample = sample_interval
+        self.plan = list(FIELD_CHECKS.items())
+        self.sampled = 0
+        self.rejected: CounterType[str] = Counter()
+        self.presence_checked = 0
+        self.presence_rejected = 0
+
+    def rejection_rate(self, check: str) -> float:
+        """Fraction of the sampled passports that failed a check"""
+        if self.sampled == 0:
+            return 0.0
+
+        return self.rejected[check] / self.sampled
+
+    def priority(self, check: str) -> float:
+        """Rejection rate per unit of cost; higher runs earlier"""
+        return self.rejection_rate(check) / CHECK_COSTS[check]
+
+    def reorder(self) -> None:
+        """Moves the cheapest and most selective field checks to the front"""
+        self.plan.sort(key=lambda step: self.priority(step[0]), reverse=True)
+
+    def _sample_checks(self, passport: Dict[str, str]) -> bool:
+        """Runs every field check, recording which ones reject"""
+        is_valid = True
+        for field_name, check in self.plan:
+            if not check(passport[field_name]):
+                self.rejected[field_name] += 1
+                is_valid = False
+
+        self.sampled += 1
+        if self.sampled % self.reorder_interval == 0:
+            self.reorder()
+
+        return is_valid
+
+    def is_complete(self, passport: Dict[str, str]) -> bool:
+        """Checks that all the required fields are present"""
+        self.presence_checked += 1
+        if not REQUIRED_FIELDS.issubset(passport):
+            self.presence_rejected += 1
+            return False
+
+        return True
+
+    def has_valid_fields(self, passport: Dict[str, str]) -> bool:
+        """Checks the fields of a passport that is known to be complete"""
+        self.until_sample -= 1
+        if self.until_sample == 0:
+            self.until_sample = self.sample_interval
+            return self._sample_checks(passport)
+
+        for field_name, check in self.plan:
+            if not check(passport[field_name]):
+                return False
+
+        return True
+
+    def is_valid(self, passport: Dict[str, str]) -> bool:
+        """Checks that all the required fields are present and valid"""
+        return self.is_complete(passport) and self.has_valid_fields(passport)
+
+
+def count_passports(filename: str = 'input.txt') -> Tuple[int, int]:
+    """
+    Reads a batch file once, and returns both the number of passports
+    with all the required fields, and the number of valid passports
+    """
+    planner = ValidationPlanner()
+    complete_passports = 0
+    valid_passports = 0
+    with open(filename) as infile:
+        for passport in read_passports(infile):
+            if not planner.is_complete(passport):
                 continue
 
-            if validators[field_name](field_value):
-                field_names.add(field_name)
+            complete_passports += 1
+            if planner.has_valid_fields(passport):
+                valid_passports += 1
 
-        if required_fields.issubset(field_names):
-            valid_passports += 1
+    return complete_passports, valid_passports
 
+
+def part2() -> None:
+    """Solution for part 2"""
+    _, valid_passports = count_passports()
     print(valid_passports)
 
 
 if __name__ == "__main__":
-    part1()
-    part2()
+    # Both parts share a single read and parse of the batch file
+    for passport_count in count_passports():
+        print(passport_count)
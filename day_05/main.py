@@ -72,59 +72,129 @@ Your seat wasn't at the very front or back, though; the seats with IDs
 
 What is the ID of your seat?
 """
-from typing import Set
+from itertools import repeat
+from typing import List, Optional, Tuple
+
+SEAT_BITS = str.maketrans('FBLR', '0101')
+SEAT_BYTES = bytes.maketrans(b'FBLR', b'0101')
 
 
 def get_seat_id(boarding_pass: str) -> int:
     """Gets the seat ID from boarding pass string"""
-    row_str, col_str = boarding_pass[:7], boarding_pass[7:]
-
-    row_binary = row_str.replace('F', '0').replace('B', '1')
-    row = int(row_binary, base=2)
-
-    col_binary = col_str.replace('L', '0').replace('R', '1')
-    col = int(col_binary, base=2)
-
-    seat_id = row * 8 + col
-    return seat_id
+    return int(boarding_pass.translate(SEAT_BITS), base=2)
+
+
+def _binary_seat_ids(
+        data: bytes,
+        row_bits: int,
+        col_bits: int,
+) -> List[bytes]:
+    """
+    Translates every boarding pass in a file at once into its seat ID
+    in binary. The seat ID is the row followed by the column, so the
+    translated passes are the IDs directly.
+    """
+    binary_ids = data.translate(SEAT_BYTES).split()
+    if binary_ids:
+        pass_length = row_bits + col_bits
+        assert len(min(binary_ids, key=len)) == pass_length, (
+            'Invalid input file'
+        )
+        assert len(max(binary_ids, key=len)) == pass_length, (
+            'Invalid input file'
+        )
+
+    return binary_ids
+
+
+def decode_seat_ids(
+        data: bytes,
+        row_bits: int = 7,
+        col_bits: int = 3,
+) -> List[int]:
+    """Decodes every boarding pass in a file into its seat ID"""
+    binary_ids = _binary_seat_ids(data, row_bits, col_bits)
+    return list(map(int, binary_ids, repeat(2)))
+
+
+def seat_bitmap(
+        seat_ids: List[int],
+        row_bits: int = 7,
+        col_bits: int = 3,
+) -> bytearray:
+    """Marks every occupied seat of the plane with a 1"""
+    bitmap = bytearray(1 << (row_bits + col_bits))
+    for seat_id in seat_ids:
+        bitmap[seat_id] = 1
+
+    return bitmap
+
+
+def find_missing_seat(bitmap: bytearray) -> Optional[int]:
+    """Finds the first empty seat that has occupied seats on both sides"""
+    index = bitmap.find(b'\x01\x00\x01')
+    if index == -1:
+        return None
+
+    return index + 1
+
+
+def summarize_seats(
+        data: bytes,
+        row_bits: int = 7,
+        col_bits: int = 3,
+) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """
+    Returns the lowest and highest seat IDs in a file of boarding passes,
+    and the single missing seat ID between them, if there is one. All
+    three are None if the file has no boarding passes.
+
+    Every step works on the whole file at once: the passes are translated
+    to fixed width binary numbers, and the extremes are found by comparing
+    them as strings. When the IDs are unique and exactly one seat in the
+    range is empty, the missing seat is the difference between the sum
+    of the full range of IDs and the sum of the decoded IDs. Otherwise it
+    is found by scanning a seat bitmap, like find_missing_seat.
+    """
+    binary_ids = _binary_seat_ids(data, row_bits, col_bits)
+    if not binary_ids:
+        return None, None, None
+
+    min_seat_id = int(min(binary_ids), base=2)
+    max_seat_id = int(max(binary_ids), base=2)
+    seat_ids = list(map(int, binary_ids, repeat(2)))
+
+    seat_count = max_seat_id - min_seat_id + 1
+    if len(set(binary_ids)) == len(binary_ids):
+        if seat_count == len(seat_ids):
+            return min_seat_id, max_seat_id, None
+
+        if seat_count == len(seat_ids) + 1:
+            full_sum = (min_seat_id + max_seat_id) * seat_count // 2
+            missing_seat_id = full_sum - sum(seat_ids)
+            if min_seat_id < missing_seat_id < max_seat_id:
+                return min_seat_id, max_seat_id, missing_seat_id
+
+    bitmap = seat_bitmap(seat_ids, row_bits, col_bits)
+    return min_seat_id, max_seat_id, find_missing_seat(bitmap)
 
 
 def part1() -> None:
     """Solution for part 1"""
-    with open('input.txt') as infile:
-        passes = infile.read().splitlines()
-
-    max_seat_id = 0
-    for boarding_pass in passes:
-        seat_id = get_seat_id(boarding_pass)
-        if seat_id > max_seat_id:
-            max_seat_id = seat_id
+    with open('input.txt', 'rb') as infile:
+        _, max_seat_id, _ = summarize_seats(infile.read())
 
-    print(max_seat_id)
+    if max_seat_id is not None:
+        print(max_seat_id)
 
 
 def part2() -> None:
     """Solution for part 2"""
-    with open('input.txt') as infile:
-        passes = infile.read().splitlines()
-
-    max_seat_id = 0
-    min_seat_id = 2 ** 10
-    seat_ids: Set[int] = set()
-    for boarding_pass in passes:
-        seat_id = get_seat_id(boarding_pass)
-
-        seat_ids.add(seat_id)
-
-        if seat_id > max_seat_id:
-            max_seat_id = seat_id
-        if seat_id < min_seat_id:
-            min_seat_id = seat_id
-
-    for seat_id in range(min_seat_id, max_seat_id):
-        if seat_id not in seat_ids:
-            print(seat_id)
-            break
+    with open('input.txt', 'rb') as infile:
+        _, _, missing_seat_id = summarize_seats(infile.read())
+
+    if missing_seat_id is not None:
+        print(missing_seat_id)
 
 
 if __name__ == "__main__":